@@ -1,56 +1,691 @@
+import asyncio
+import concurrent.futures
 import hashlib
+import inspect
+import json
+import math
+import os
 import pickle
+import random
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
-from typing import Callable, Any
+from typing import Callable, Any, Iterable
 
-def simple_redis_cache(redis_client, ttl: int = 60, raise_redis: bool = False) -> Callable:
+try:
+    import xxhash
+except ImportError:  # Optional dependency - fall back to the stdlib
+    xxhash = None
+
+try:
+    import orjson
+
+    # Types orjson would silently turn into str/dict/int are passed to `default` instead, which refuses them
+    _ORJSON_OPTIONS = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_SUBCLASS
+    )
+except ImportError:  # Optional dependency - `dumps_json_value` falls back to pickle
+    orjson = None
+
+
+_PROTO = pickle.HIGHEST_PROTOCOL  # Shortest and fastest output, all protocols >= 2 start with b"\x80"
+
+
+def _digest(data: bytes) -> bytes:
+    """Hash `data` to a raw 16-byte digest with xxh3-128, or BLAKE2b-128 without xxhash."""
+    if xxhash is not None:
+        return xxhash.xxh3_128_digest(data)
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+_REPR_SAFE_TYPES = frozenset({int, float, str, bytes, bool, type(None)})
+
+
+def _is_repr_safe(obj: Any) -> bool:
+    """Whether `repr(obj)` is a deterministic, unambiguous encoding of `obj` (primitives and tuples/lists of them)."""
+    cls = type(obj)
+    if cls in _REPR_SAFE_TYPES:
+        return True
+    if cls is tuple or cls is list:
+        return all(_is_repr_safe(item) for item in obj)
+    return False
+
+
+def _hash_key(payload: tuple, marker: bytes = b"") -> bytes:
+    """Hash call arguments, preceded by `marker`: serialized with `repr` for plain primitives, with pickle otherwise."""
+    try:
+        repr_safe = _is_repr_safe(payload)
+    except RecursionError:  # Self-referencing (or extremely deep) lists, pickle handles them
+        repr_safe = False
+    if repr_safe:
+        return _digest(marker + repr(payload).encode())  # Starts with "(", never collides with pickle's b"\x80"
+    return _digest(marker + pickle.dumps(payload, _PROTO))
+
+
+def dumps_value(result: Any) -> bytes:
+    """Serialize a result with pickle, the default: it is fast, compact and preserves every type."""
+    return pickle.dumps(result, _PROTO)
+
+
+def _refuse_json(obj: Any) -> Any:
+    raise TypeError(f"{type(obj).__name__} does not round-trip through JSON")
+
+
+def dumps_json_value(result: Any) -> bytes:
+    """
+    Serialize a result with orjson, falling back to pickle for anything that wouldn't come back unchanged:
+    datetimes, dataclasses, subclasses of builtins, non-str dict keys, 64-bit+ ints and other unknown types.
+    Opt-in with `serializer=dumps_json_value` for JSON-shaped results only, since some types are still changed:
+    tuples come back as lists, NaN and infinities as None, Enums as their value and UUIDs as str.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(result, default=_refuse_json, option=_ORJSON_OPTIONS)
+        except TypeError:
+            pass
+    return pickle.dumps(result, _PROTO)
+
+
+def loads_value(data: bytes) -> Any:
+    """Deserialize a value written by `dumps_value` or `dumps_json_value`, sniffing pickle's b"\x80" header."""
+    if data[:1] == b"\x80":
+        return pickle.loads(data)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _local_key(args: tuple, kwargs: dict) -> Any:
     """
-    A decorator to cache function results in Redis using hashed keys and pickled values.
-    The `kwargs` are always sorted to guarantee consistent hashes regardless of argument order.
+    A cheap in-process key for calls whose arguments are all plain primitives, None for any other call.
+    Argument types are part of the key, since `1`, `1.0` and `True` are equal but may give different results.
+    So are the signs of floats, since `0.0 == -0.0` too.
+    """
+    if kwargs:
+        sorted_kwargs = tuple(sorted(kwargs.items()))
+        values = args + tuple(value for _, value in sorted_kwargs)
+    else:
+        sorted_kwargs = ()
+        values = args
+    types = tuple(map(type, values))
+    for cls in types:
+        if cls not in _REPR_SAFE_TYPES:
+            return None
+    if float in types:
+        signs = tuple(math.copysign(1.0, value) if type(value) is float else 0.0 for value in values)
+        return args, sorted_kwargs, types, signs
+    return args, sorted_kwargs, types
+
+
+def _make_key(prefix: bytes, args: tuple, kwargs: dict) -> bytes:
+    """Build the Redis key of a call: `prefix` followed by the hash of its arguments."""
+    # Hash function arguments, with sorted kwargs for consistency
+    if kwargs:
+        if len(kwargs) == 1:
+            sorted_kwargs = tuple(kwargs.items())  # A single item is already sorted
+        else:
+            sorted_kwargs = tuple(sorted(kwargs.items()))  # Sort kwargs by key => list of tuples
+        # b"k" marks calls with kwargs, f(1, z=2) and f((1,), (("z", 2),)) must not share a key
+        key_hash = _hash_key((args, sorted_kwargs), b"k")
+    else:
+        key_hash = _hash_key(args)  # Positional-only call, the common case
+
+    # Construct Redis key with function name and the raw (binary) hash
+    return prefix + key_hash
+
+
+_MISSING = object()
+
+
+class _OmittedDefault:
+    """Stands in a key for an omitted argument whose default is not a plain primitive (it may not even pickle)."""
+
+    __slots__ = ()
+
+    def __reduce__(self) -> str:
+        return "_OMITTED_DEFAULT"  # Pickled by reference to the module-level instance
+
+
+_OMITTED_DEFAULT = _OmittedDefault()
+
+
+def _key_default(default: Any) -> Any:
+    """The value standing in a key for an omitted argument: the default itself if it is a plain primitive."""
+    try:
+        return default if _is_repr_safe(default) else _OMITTED_DEFAULT
+    except RecursionError:
+        return _OMITTED_DEFAULT
+
+
+class _LocalCache:
+    """A small thread-safe in-process LRU cache whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key => (deadline, value), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        """Return the value stored under `key`, or `_MISSING` if absent or expired."""
+        if self.maxsize <= 0:
+            return _MISSING
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Any, value: Any) -> None:
+        """Store `value` under `key`, evicting the least recently used entry when full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+def _make_normalizer(func: Callable) -> Callable[[tuple, dict], tuple]:
+    """
+    Build a function mapping the `(args, kwargs)` of a call to `func` to a canonical form, with
+    defaults applied, so equivalent calls like `f(1, 2)`, `f(1, y=2)` and `f(y=2, x=1)` share a key.
+    Defaults other than plain primitives are replaced by a placeholder rather than copied into the key.
+    """
+    try:
+        sig = inspect.signature(func)
+    except (TypeError, ValueError):  # Some builtins have no introspectable signature
+        return lambda args, kwargs: (args, kwargs)
+
+    key_defaults = {
+        name: _key_default(p.default) for name, p in sig.parameters.items() if p.default is not p.empty
+    }
+
+    def bind(args: tuple, kwargs: dict) -> tuple:
+        try:
+            bound = sig.bind(*args, **kwargs)
+        except TypeError:
+            return args, kwargs  # Invalid call, the function itself will raise
+        arguments = bound.arguments
+        for name, default in key_defaults.items():
+            if name not in arguments:
+                arguments[name] = default
+        return bound.args, bound.kwargs
+
+    # With *args, **kwargs or keyword-only parameters, every call has to be bound
+    params = tuple(sig.parameters.values())
+    if not all(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in params):
+        return bind
+
+    # Plain signature: map calls onto the parameter slots directly, precomputed once
+    n_params = len(params)
+    n_required = sum(p.default is p.empty for p in params)  # Parameters with defaults are always last
+    defaults = tuple(key_defaults.get(p.name, _MISSING) for p in params)
+    slots = {p.name: i for i, p in enumerate(params) if p.kind is p.POSITIONAL_OR_KEYWORD}
+
+    def normalize(args: tuple, kwargs: dict) -> tuple:
+        n_args = len(args)
+        if not kwargs:
+            if n_args == n_params:
+                return args, kwargs  # Already canonical
+            if n_required <= n_args < n_params:
+                return args + defaults[n_args:], kwargs
+            return args, kwargs  # Invalid call, the function itself will raise
+        if n_args > n_params:
+            return args, kwargs
+        values = list(args)
+        values.extend(defaults[n_args:])
+        for name, value in kwargs.items():
+            slot = slots.get(name)
+            if slot is None or slot < n_args:
+                return args, kwargs  # Unknown or duplicated argument
+            values[slot] = value
+        for i in range(n_args, n_required):
+            if values[i] is _MISSING:
+                return args, kwargs  # Missing required argument
+        return tuple(values), {}
+
+    return normalize
+
+
+# Returns {value, 0} on a hit. On a miss, tries to take the lock of the key with the caller's token:
+# {nil, 1} if taken, {nil, 0} otherwise
+_LOOKUP_OR_LOCK = """
+local value = redis.call('GET', KEYS[1])
+if value then
+    return {value, 0}
+end
+if redis.call('SET', KEYS[2], ARGV[2], 'NX', 'EX', ARGV[1]) then
+    return {false, 1}
+end
+return {false, 0}
+"""
+# Deletes the lock only if it still holds the caller's token, it may have expired and been taken by another worker
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+# Stores the computed value like `SET NX EX`, then releases the lock the same way as _RELEASE_LOCK
+_STORE_AND_RELEASE = """
+redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2])
+if redis.call('GET', KEYS[2]) == ARGV[3] then
+    redis.call('DEL', KEYS[2])
+end
+return 0
+"""
+_LOCK_POLL_INTERVAL = 0.05  # Seconds between two lookups while another worker computes the value
+
+
+def _lookup_or_wait_for_lock(
+    lookup_or_lock: Callable, redis_key: bytes, lock_key: bytes, lock_token: bytes, lock_ttl: int
+) -> tuple:
+    """
+    Look `redis_key` up, or take its lock (holding `lock_token`) so that only one worker computes the missing value.
+    While another worker holds the lock, poll until the value shows up or the lock would have expired.
+
+    Returns:
+        The cached value (None on a miss) and whether the lock was taken.
+    """
+    deadline = time.monotonic() + lock_ttl
+    while True:
+        cached_result, owns_lock = lookup_or_lock(keys=[redis_key, lock_key], args=[lock_ttl, lock_token])
+        if cached_result is not None or owns_lock or time.monotonic() >= deadline:
+            return cached_result, bool(owns_lock)
+        time.sleep(_LOCK_POLL_INTERVAL)
+
+
+class _SingleFlight:
+    """Deduplicates concurrent calls for the same key within the process: one caller runs, the others wait for it."""
+
+    def __init__(self):
+        self._inflight = {}  # key => future of the running call
+        self._lock = threading.Lock()
+
+    def run(self, key: Any, fn: Callable, *args) -> Any:
+        """Return `fn(*args)`, or the result of the identical call already running in another thread."""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = concurrent.futures.Future()
+        if not leader:
+            return future.result()
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result
+
+    async def run_async(self, key: Any, fn: Callable, *args) -> Any:
+        """Return `await fn(*args)`, or the result of the identical call already awaited by another task."""
+        loop = asyncio.get_running_loop()
+        key = (loop, key)  # Futures belong to one event loop, calls from other loops are deduplicated apart
+        while True:
+            with self._lock:
+                future = self._inflight.get(key)
+                leader = future is None
+                if leader:
+                    future = self._inflight[key] = loop.create_future()
+                    future.add_done_callback(_retrieve_exception)  # Nobody may be waiting for it
+            if leader:
+                break
+            result = await asyncio.shield(future)  # A cancelled waiter must not cancel the others
+            if result is not _MISSING:
+                return result
+            # The leader was cancelled, which says nothing about the waiters: retry, one of them leads next
+        try:
+            result = await fn(*args)
+        except asyncio.CancelledError:
+            self._finish(key)
+            future.set_result(_MISSING)
+            raise
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result
+
+    def _finish(self, key: Any) -> None:
+        with self._lock:
+            del self._inflight[key]
+
+
+def _retrieve_exception(future: asyncio.Future) -> None:
+    """Mark the exception of `future` as retrieved, so asyncio doesn't log it when no one awaited it."""
+    future.exception()
+
+
+class _Timing:
+    """Exponentially weighted moving average of a function's execution time, in seconds."""
+
+    __slots__ = ("average",)
+    alpha = 0.2  # Weight of the latest measurement
+
+    def __init__(self):
+        self.average = None  # Unknown until the function ran once
+
+    def update(self, elapsed: float) -> None:
+        if self.average is None:
+            self.average = elapsed
+        else:
+            self.average += self.alpha * (elapsed - self.average)
+
+    def below(self, threshold: float) -> bool:
+        """Whether the function is known to run faster than `threshold` seconds."""
+        return self.average is not None and self.average < threshold
+
+
+def simple_redis_cache(
+    redis_client,
+    ttl: int = 60,
+    raise_redis: bool = False,
+    serializer: Callable[[Any], bytes] = dumps_value,
+    deserializer: Callable[[bytes], Any] = loads_value,
+    l1_size: int = 1024,
+    l1_ttl: float = 1.0,
+    min_duration: float = 0.0,
+    lock_ttl: int = 0,
+) -> Callable:
+    """
+    A decorator to cache function results in Redis using hashed keys and serialized values.
+    Arguments are bound to the function signature (with defaults applied) and the remaining `kwargs`
+    are sorted, to guarantee consistent hashes regardless of how the arguments are passed.
 
     Args:
         redis_client: The Redis client used for caching. Is required.
         ttl: Time-to-live (in seconds) for cached results. Defaults to 60 seconds.
         raise_redis: Whether to raise an exception if Redis connection fails. Defaults to False.
+        serializer: Turns a result into bytes. Defaults to pickle, see `dumps_json_value` for orjson.
+        deserializer: Turns cached bytes back into a result. Must understand the `serializer` output.
+        l1_size: Number of results also kept in process memory, in front of Redis. 0 disables it. Defaults to 1024.
+        l1_ttl: Seconds a result stays in process memory (capped at `ttl`). Defaults to 1 second.
+            Hits served from memory return the same object, don't mutate cached results.
+        min_duration: Functions running on average faster than this many seconds are not cached,
+            recomputing them is cheaper than a cache round-trip. Defaults to 0 (always cache).
+        lock_ttl: When > 0, a miss takes a Redis lock (for at most this many seconds) in the same atomic
+            Lua script as the lookup, so that only one worker computes the value while the others wait
+            for it. Defaults to 0 (no locking). Not supported on Redis Cluster. Only available on this
+            sync decorator, and `batch()` ignores it.
 
     Returns:
-        A decorator for caching function results.
+        A decorator for caching function results. The decorated function has a `batch(calls)`
+        method to look up and cache many calls in a constant number of round-trips.
     """
     def outer(func: Callable) -> Callable:
+        # Bind everything that is constant per decorated function once, not on every call
+        prefix = (func.__name__ + ":").encode()
+        normalize = _make_normalizer(func)
+        l1 = _LocalCache(l1_size, min(l1_ttl, ttl))
+        timing = _Timing()
+        # Decided once here rather than on every call
+        skip_cheap = min_duration > 0
+        use_local_keys = l1_size > 0
+        redis_get = redis_client.get
+        redis_set = redis_client.set
+        # Loaded lazily and run with EVALSHA by redis-py
+        lookup_or_lock = redis_client.register_script(_LOOKUP_OR_LOCK) if lock_ttl > 0 else None
+        release_lock = redis_client.register_script(_RELEASE_LOCK) if lock_ttl > 0 else None
+        store_and_release = redis_client.register_script(_STORE_AND_RELEASE) if lock_ttl > 0 else None
+        inflight = _SingleFlight()
+
+        def lookup_or_compute(redis_key: bytes, l1_key: Any, args: tuple, kwargs: dict) -> Any:
+            """Look the call up in Redis, or compute its result and cache it."""
+            # Check if the result is in the cache
+            lock_key = redis_key + b":lock"
+            owns_lock = False
+            try:
+                if lookup_or_lock is None:
+                    cached_result = redis_get(redis_key)  # Raises on its own if Redis is unreachable
+                else:
+                    lock_token = os.urandom(16)  # Identifies this caller's lock
+                    cached_result, owns_lock = _lookup_or_wait_for_lock(
+                        lookup_or_lock, redis_key, lock_key, lock_token, lock_ttl
+                    )
+            except Exception as e:
+                if raise_redis:
+                    raise e
+                cached_result = None
+            if cached_result is not None:
+                # Cache hit - deserialize result
+                result = deserializer(cached_result)
+                l1.set(l1_key, result)
+                return result
+
+            # Cache miss - compute the result and store it in the cache
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                if owns_lock:
+                    # Let the next worker compute it rather than waiting for the lock to expire
+                    try:
+                        release_lock(keys=[lock_key], args=[lock_token])
+                    except Exception:
+                        pass
+                raise
+            timing.update(time.perf_counter() - start)
+            # Keep the live object in memory before the SET, so callers arriving meanwhile reuse it
+            # without another serialization round - the result is serialized exactly once below
+            l1.set(l1_key, result)
+            try:
+                # Cache serialized result. NX: only the first of concurrent writers stores it (and its TTL),
+                # the jitter spreads the expiry of keys cached at the same time
+                value_ttl = ttl + random.randint(0, ttl // 10)
+                if owns_lock:
+                    # Store the value and release the lock in a single script call
+                    store_and_release(keys=[redis_key, lock_key], args=[serializer(result), value_ttl, lock_token])
+                else:
+                    redis_set(redis_key, serializer(result), ex=value_ttl, nx=True)
+            except Exception as e:
+                if raise_redis:
+                    raise e
+            return result
+
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
+            if skip_cheap and timing.below(min_duration):
+                # Too cheap to be worth caching - just run it, keeping track of its duration
+                start = time.perf_counter()
+                result = func(*args, **kwargs)
+                timing.update(time.perf_counter() - start)
+                return result
+
+            # Check the in-process cache first, it saves a Redis round-trip. Calls made of plain
+            # primitives are looked up as they are, without normalizing, serializing or hashing them
+            redis_key = None
+            l1_key = _local_key(args, kwargs) if use_local_keys else None
+            if l1_key is None:
+                l1_key = redis_key = _make_key(prefix, *normalize(args, kwargs))
+            result = l1.get(l1_key)
+            if result is not _MISSING:
+                return result
+            if redis_key is None:
+                redis_key = _make_key(prefix, *normalize(args, kwargs))
+
+            # Concurrent identical calls in this process share a single lookup (and computation)
+            return inflight.run(redis_key, lookup_or_compute, redis_key, l1_key, args, kwargs)
+
+        def batch(calls: Iterable[tuple]) -> list:
+            """
+            Call the function for many argument sets at once: a single MGET looks all of them up,
+            and a single pipeline caches the misses. Identical calls are computed once.
+
+            Args:
+                calls: `(args, kwargs)` pairs, e.g. `[((1, 2), {}), ((3,), {"y": 4})]`.
+
+            Returns:
+                The results, in the order of `calls`.
+            """
+            calls = list(calls)
+            if skip_cheap and timing.below(min_duration):
+                return [wrapper(*args, **kwargs) for args, kwargs in calls]
+
+            # Same two-tier L1 keys as `wrapper`, so both see each other's in-process entries
+            l1_keys, keys = [], []  # keys: Redis keys, None until needed for calls with a local key
+            for args, kwargs in calls:
+                l1_key = _local_key(args, kwargs) if use_local_keys else None
+                if l1_key is None:
+                    l1_key = _make_key(prefix, *normalize(args, kwargs))
+                    keys.append(l1_key)
+                else:
+                    keys.append(None)
+                l1_keys.append(l1_key)
+            results = [l1.get(l1_key) for l1_key in l1_keys]
+            lookups = [i for i, result in enumerate(results) if result is _MISSING]
+            if not lookups:
+                return results
+            for i in lookups:
+                if keys[i] is None:
+                    keys[i] = _make_key(prefix, *normalize(*calls[i]))
+
+            # Look up everything not in process memory in one round-trip
             try:
-                redis_client.ping()
+                cached_results = redis_client.mget([keys[i] for i in lookups])
             except Exception as e:
                 if raise_redis:
                     raise e
-            # Serialize function arguments, with sorted kwargs for consistency
-            sorted_kwargs = tuple(sorted(kwargs.items()))  # Sort kwargs by key => list of tuples
-            key_data = pickle.dumps((args, sorted_kwargs))  # Serialize args + sorted kwargs
-            key_hash = hashlib.sha256(key_data).hexdigest()  # Create MD5 hash of the serialized data
+                cached_results = [None] * len(lookups)
+
+            computed = {}  # key => result of the cache misses
+            for i, cached_result in zip(lookups, cached_results):
+                key = keys[i]
+                if cached_result is not None:
+                    results[i] = deserializer(cached_result)
+                elif key in computed:
+                    results[i] = computed[key]
+                else:
+                    args, kwargs = calls[i]
+                    start = time.perf_counter()
+                    results[i] = computed[key] = func(*args, **kwargs)
+                    timing.update(time.perf_counter() - start)
+                l1.set(l1_keys[i], results[i])
+
+            # Cache all the misses in one round-trip
+            if computed:
+                try:
+                    pipe = redis_client.pipeline(transaction=False)
+                    for key, result in computed.items():
+                        pipe.set(key, serializer(result), ex=ttl + random.randint(0, ttl // 10), nx=True)
+                    pipe.execute()
+                except Exception as e:
+                    if raise_redis:
+                        raise e
+            return results
+
+        wrapper.batch = batch
+        return wrapper
+    return outer
+
+
+def simple_redis_cache_async(
+    redis_client,
+    ttl: int = 60,
+    raise_redis: bool = False,
+    serializer: Callable[[Any], bytes] = dumps_value,
+    deserializer: Callable[[bytes], Any] = loads_value,
+    l1_size: int = 1024,
+    l1_ttl: float = 1.0,
+    min_duration: float = 0.0,
+) -> Callable:
+    """
+    The `simple_redis_cache` decorator for coroutine functions, using an asyncio Redis client
+    (e.g. `redis.asyncio.Redis`) so that waiting on Redis does not block the event loop.
+    Keys and values are compatible with `simple_redis_cache`.
 
-            # Construct Redis key with function name and hash
-            redis_key = f"{func.__name__}:{key_hash}"
+    Args:
+        redis_client: The asyncio Redis client used for caching. Is required.
+        ttl: Time-to-live (in seconds) for cached results. Defaults to 60 seconds.
+        raise_redis: Whether to raise an exception if Redis connection fails. Defaults to False.
+        serializer: Turns a result into bytes. Defaults to pickle, see `dumps_json_value` for orjson.
+        deserializer: Turns cached bytes back into a result. Must understand the `serializer` output.
+        l1_size: Number of results also kept in process memory, in front of Redis. 0 disables it. Defaults to 1024.
+        l1_ttl: Seconds a result stays in process memory (capped at `ttl`). Defaults to 1 second.
+            Hits served from memory return the same object, don't mutate cached results.
+        min_duration: Functions running on average faster than this many seconds are not cached,
+            recomputing them is cheaper than a cache round-trip. Defaults to 0 (always cache).
 
+    Returns:
+        A decorator for caching coroutine function results.
+    """
+    def outer(func: Callable) -> Callable:
+        if not inspect.iscoroutinefunction(func):
+            raise TypeError(f"{func.__name__} is not a coroutine function, use simple_redis_cache instead")
+        prefix = (func.__name__ + ":").encode()
+        normalize = _make_normalizer(func)
+        l1 = _LocalCache(l1_size, min(l1_ttl, ttl))
+        timing = _Timing()
+        # Decided once here rather than on every call
+        skip_cheap = min_duration > 0
+        use_local_keys = l1_size > 0
+        inflight = _SingleFlight()
+
+        async def lookup_or_compute(redis_key: bytes, l1_key: Any, args: tuple, kwargs: dict) -> Any:
+            """Look the call up in Redis, or compute its result and cache it."""
             # Check if the result is in the cache
             try:
-                cached_result = redis_client.get(redis_key)
+                cached_result = await redis_client.get(redis_key)  # Raises on its own if Redis is unreachable
             except Exception as e:
                 if raise_redis:
                     raise e
                 cached_result = None
-            if cached_result:
-                # Cache hit - unpickle result
-                return pickle.loads(cached_result)
+            if cached_result is not None:
+                # Cache hit - deserialize result
+                result = deserializer(cached_result)
+                l1.set(l1_key, result)
+                return result
 
             # Cache miss - compute the result and store it in the cache
-            result = func(*args, **kwargs)
+            start = time.perf_counter()
+            result = await func(*args, **kwargs)
+            timing.update(time.perf_counter() - start)
+            # Keep the live object in memory before the SET, so callers arriving meanwhile reuse it
+            # without another serialization round - the result is serialized exactly once below
+            l1.set(l1_key, result)
             try:
-                redis_client.set(redis_key, pickle.dumps(result), ex=ttl)  # Cache pickled result
+                # Cache serialized result, see `simple_redis_cache` for NX and the TTL jitter
+                await redis_client.set(redis_key, serializer(result), ex=ttl + random.randint(0, ttl // 10), nx=True)
             except Exception as e:
                 if raise_redis:
                     raise e
             return result
 
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            if skip_cheap and timing.below(min_duration):
+                # Too cheap to be worth caching - just run it, keeping track of its duration
+                start = time.perf_counter()
+                result = await func(*args, **kwargs)
+                timing.update(time.perf_counter() - start)
+                return result
+
+            # Check the in-process cache first, it saves a Redis round-trip. Calls made of plain
+            # primitives are looked up as they are, without normalizing, serializing or hashing them
+            redis_key = None
+            l1_key = _local_key(args, kwargs) if use_local_keys else None
+            if l1_key is None:
+                l1_key = redis_key = _make_key(prefix, *normalize(args, kwargs))
+            result = l1.get(l1_key)
+            if result is not _MISSING:
+                return result
+            if redis_key is None:
+                redis_key = _make_key(prefix, *normalize(args, kwargs))
+
+            # Concurrent identical calls in this process share a single lookup (and computation)
+            return await inflight.run_async(redis_key, lookup_or_compute, redis_key, l1_key, args, kwargs)
+
         return wrapper
-    return outer
\ No newline at end of file
+    return outer
@@ -1,8 +1,7 @@
 # Mock Redis client
-import pickle
 import time
 
-from base import simple_redis_cache
+from base import simple_redis_cache, loads_value
 
 
 class MockRedis:
@@ -10,8 +9,11 @@ class MockRedis:
         self.store = {}
     def get(self, key):
         return self.store.get(key)
-    def set(self, key, value, ex=None):
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return None
         self.store[key] = value  # Ignoring expiration in this mock.
+        return True
 redis_client = MockRedis()
 
 
@@ -30,7 +32,7 @@ print(example_function(1, 2, z=3))  # Same hash!
 
 # Check Redis keys
 for key, value in redis_client.store.items():
-    print(f"Key: {key}, Value: {pickle.loads(value)}")
+    print(f"Key: {key}, Value: {loads_value(value)}")
 
 class MyClass:
     def __init__(self, val):
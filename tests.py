@@ -1,7 +1,16 @@
+import asyncio
+import dataclasses
+import datetime
+import math
+import pickle
+import threading
+import time
+
 import pytest
+import redis.asyncio
 from testcontainers.redis import RedisContainer
 
-from base import simple_redis_cache
+from base import dumps_json_value, dumps_value, loads_value, simple_redis_cache, simple_redis_cache_async
 
 
 @pytest.fixture(scope="module")
@@ -23,6 +32,11 @@ def add_numbers(a, b):
 def complex_function(x, y, z=10):
     return {"x": x, "y": y, "z": z, "sum": x + y + z}
 
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: int
+
 class ComplexClass:
     def __init__(self, val):
         self.val = val
@@ -70,6 +84,14 @@ def test_cache_eviction_via_ttl(redis_client):
     result = cached_add(2, 3)
     assert result == 5  # Computed again
 
+def test_self_referencing_argument(redis_client):
+    cached_len = simple_redis_cache(redis_client, ttl=120)(len)
+    cyclic = [1]
+    cyclic.append(cyclic)
+
+    assert cached_len(cyclic) == 2
+    assert cached_len(cyclic) == 2  # From cache
+
 def test_cache_complex_structure(redis_client):
     complex_obj = ComplexClass(10)
     complex_obj.property_1 = 20
@@ -82,3 +104,306 @@ def test_cache_complex_structure(redis_client):
     assert result.val == 10
     assert result.property_1 == 20
     assert result.property_2 == 30
+
+def test_default_serializer_is_plain_pickle():
+    # The default must not cost more than pickle, JSON encoding is opt-in
+    rows = [{"id": i, "name": f"row {i}", "score": i / 3} for i in range(5000)]
+    assert dumps_value(rows) == pickle.dumps(rows, pickle.HIGHEST_PROTOCOL)
+    assert loads_value(dumps_value(rows)) == rows
+    assert loads_value(dumps_json_value(rows)) == rows
+
+def test_json_serializer_falls_back_to_pickle():
+    # orjson would turn these into str/dict/int silently
+    values = [datetime.datetime(2024, 1, 1), Point(1, 2), {"when": datetime.date(2024, 1, 1)}]
+    for value in values:
+        assert loads_value(dumps_json_value(value)) == value
+        assert type(loads_value(dumps_json_value(value))) is type(value)
+
+def test_cache_preserves_result_types(redis_client):
+    cached_pair = simple_redis_cache(redis_client, ttl=120)(lambda x: (x, {1: x}))
+
+    # Tuples and non-str dict keys are not JSON-native, they must not come back as lists/str keys
+    assert cached_pair(5) == (5, {1: 5})
+    assert cached_pair(5) == (5, {1: 5})  # From cache
+
+def test_async_cache_decorator(redis_client):
+    calls = []
+
+    async def async_add(a, b):
+        calls.append((a, b))
+        return a + b
+
+    async def run():
+        async_client = redis.asyncio.Redis(**redis_client.connection_pool.connection_kwargs)
+        cached_add = simple_redis_cache_async(async_client, ttl=120)(async_add)
+        first = await cached_add(10, 20)
+        second = await cached_add(10, 20)  # From cache
+        await async_client.aclose()
+        return first, second
+
+    assert asyncio.run(run()) == (30, 30)
+    assert calls == [(10, 20)]
+
+def test_local_cache_serves_recent_results(redis_client):
+    calls = []
+
+    def tracked_add(a, b):
+        calls.append((a, b))
+        return a + b
+
+    cached_add = simple_redis_cache(redis_client, ttl=120, l1_ttl=5)(tracked_add)
+    assert cached_add(7, 8) == 15
+
+    # Recent results are served from process memory, even if Redis lost them
+    redis_client.flushdb()
+    assert cached_add(7, 8) == 15
+    assert calls == [(7, 8)]
+
+def test_min_duration_skips_caching_cheap_functions(redis_client):
+    calls = []
+
+    def cheap_add(a, b):
+        calls.append((a, b))
+        return a + b
+
+    cached_add = simple_redis_cache(redis_client, ttl=120, min_duration=60)(cheap_add)
+    assert cached_add(4, 4) == 8
+    assert cached_add(4, 4) == 8  # Known to be cheap, recomputed instead of cached
+    assert calls == [(4, 4), (4, 4)]
+
+def test_equivalent_calls_share_cache_entry(redis_client):
+    calls = []
+
+    def tracked_complex(x, y, z=10):
+        calls.append((x, y, z))
+        return complex_function(x, y, z)
+
+    cached_complex = simple_redis_cache(redis_client, ttl=120)(tracked_complex)
+    expected = {"x": 1, "y": 2, "z": 10, "sum": 13}
+
+    # Positional, keyword and default arguments all bind to the same call
+    assert cached_complex(1, 2) == expected
+    assert cached_complex(1, 2, 10) == expected
+    assert cached_complex(1, y=2) == expected
+    assert cached_complex(z=10, y=2, x=1) == expected
+    assert calls == [(1, 2, 10)]
+
+def test_unpicklable_default_is_not_part_of_key(redis_client):
+    calls = []
+
+    def guarded_add(x, y, guard=threading.Lock()):
+        with guard:
+            calls.append((x, y))
+            return x + y
+
+    cached_add = simple_redis_cache(redis_client, ttl=120, raise_redis=True)(guarded_add)
+
+    assert cached_add(1, 2) == 3
+    assert cached_add(1, y=2) == 3
+    assert calls == [(1, 2)]
+
+def test_result_serialized_once_per_miss(redis_client):
+    dumped, loaded = [], []
+
+    def counting_dumps(result):
+        dumped.append(result)
+        return dumps_value(result)
+
+    def counting_loads(data):
+        loaded.append(data)
+        return loads_value(data)
+
+    cached_complex = simple_redis_cache(
+        redis_client, ttl=120, l1_ttl=5, serializer=counting_dumps, deserializer=counting_loads
+    )(complex_function)
+
+    assert cached_complex(3, 4) == {"x": 3, "y": 4, "z": 10, "sum": 17}
+    assert cached_complex(3, 4) == {"x": 3, "y": 4, "z": 10, "sum": 17}  # From process memory
+    assert len(dumped) == 1
+    assert loaded == []
+
+def test_batch_looks_up_and_caches_many_calls(redis_client):
+    calls = []
+
+    def tracked_add(a, b):
+        calls.append((a, b))
+        return a + b
+
+    cached_add = simple_redis_cache(redis_client, ttl=120, l1_size=0)(tracked_add)
+    assert cached_add(1, 1) == 2
+
+    # (1, 1) is already cached, the duplicated (5, 5) is computed once
+    assert cached_add.batch([((1, 1), {}), ((5, 5), {}), ((5,), {"b": 5})]) == [2, 10, 10]
+    assert calls == [(1, 1), (5, 5)]
+
+    # Batched results are cached for regular calls too
+    assert cached_add(5, 5) == 10
+    assert calls == [(1, 1), (5, 5)]
+
+def test_batch_shares_local_cache_with_calls(redis_client):
+    calls = []
+
+    def tracked_add(a, b):
+        calls.append((a, b))
+        return a + b
+
+    cached_add = simple_redis_cache(redis_client, ttl=120, l1_ttl=5)(tracked_add)
+    assert cached_add(100, 1) == 101
+    assert cached_add.batch([((200, 2), {})]) == [202]
+
+    # Both directions are served from process memory, even if Redis lost the entries
+    redis_client.flushdb()
+    assert cached_add.batch([((100, 1), {})]) == [101]
+    assert cached_add(200, 2) == 202
+    assert calls == [(100, 1), (200, 2)]
+
+def test_lock_ttl_computes_once_and_releases_lock(redis_client):
+    calls = []
+
+    def locked_add(a, b):
+        calls.append((a, b))
+        return a + b
+
+    cached_add = simple_redis_cache(redis_client, ttl=120, l1_size=0, lock_ttl=5)(locked_add)
+    assert cached_add(6, 7) == 13
+    assert cached_add(6, 7) == 13  # From cache, via the Lua lookup
+    assert calls == [(6, 7)]
+
+    # The lock is released as soon as the value is cached
+    keys = list(redis_client.scan_iter(match=b"locked_add:*"))
+    assert len(keys) == 1
+    assert not keys[0].endswith(b":lock")
+
+def test_lock_ttl_waiter_receives_owner_value(redis_client):
+    calls = []
+
+    def make_client(name):
+        # Separate decorator instances behave like separate workers sharing Redis
+        def locked_double(x):
+            calls.append(name)
+            time.sleep(1)
+            return x * 2
+        return simple_redis_cache(redis_client, ttl=120, l1_size=0, lock_ttl=5)(locked_double)
+
+    owner, waiter = make_client("owner"), make_client("waiter")
+    owner_results = []
+    owner_thread = threading.Thread(target=lambda: owner_results.append(owner(21)))
+    owner_thread.start()
+    time.sleep(0.3)  # Let the owner take the lock
+
+    # The waiter blocks on the lock and gets the owner's value without computing it
+    assert waiter(21) == 42
+    owner_thread.join()
+    assert owner_results == [42]
+    assert calls == ["owner"]
+
+def test_concurrent_misses_compute_once(redis_client):
+    calls = []
+
+    def slow_add(a, b):
+        calls.append((a, b))
+        time.sleep(0.5)
+        return a + b
+
+    cached_add = simple_redis_cache(redis_client, ttl=120)(slow_add)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cached_add(20, 22))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [42] * 5
+    assert calls == [(20, 22)]
+
+def test_equal_arguments_of_different_types_are_cached_apart(redis_client):
+    cached_type = simple_redis_cache(redis_client, ttl=120)(lambda value: type(value).__name__)
+
+    # 1 == 1.0 == True, but they must not share a cache entry
+    assert [cached_type(1), cached_type(1.0), cached_type(True)] == ["int", "float", "bool"]
+    assert [cached_type(1), cached_type(1.0), cached_type(True)] == ["int", "float", "bool"]
+
+def test_signed_zeros_are_cached_apart(redis_client):
+    cached_sign = simple_redis_cache(redis_client, ttl=120)(lambda value: math.copysign(1, value))
+
+    # 0.0 == -0.0 and both are floats, but they must not share a cache entry
+    assert [cached_sign(0.0), cached_sign(-0.0)] == [1.0, -1.0]
+    assert [cached_sign(0.0), cached_sign(-0.0)] == [1.0, -1.0]
+
+def test_empty_cached_value_is_a_hit(redis_client):
+    calls = []
+
+    def echo(text):
+        calls.append(text)
+        return text
+
+    cached_echo = simple_redis_cache(
+        redis_client, ttl=120, l1_size=0, serializer=str.encode, deserializer=bytes.decode
+    )(echo)
+
+    # "" is stored as b"", which is falsy but still a cache hit
+    assert cached_echo("") == ""
+    assert cached_echo("") == ""
+    assert calls == [""]
+
+def test_async_waiter_survives_leader_cancellation(redis_client):
+    calls = []
+
+    async def slow_double(x):
+        calls.append(x)
+        await asyncio.sleep(0.5)
+        return x * 2
+
+    async def run():
+        async_client = redis.asyncio.Redis(**redis_client.connection_pool.connection_kwargs)
+        cached_double = simple_redis_cache_async(async_client, ttl=120)(slow_double)
+        leader = asyncio.create_task(cached_double(50))
+        await asyncio.sleep(0.1)
+        waiter = asyncio.create_task(cached_double(50))
+        await asyncio.sleep(0.1)
+
+        # Cancelling the leader must not cancel the waiter, which takes over instead
+        leader.cancel()
+        result = await waiter
+        await async_client.aclose()
+        return leader.cancelled(), result
+
+    assert asyncio.run(run()) == (True, 100)
+    assert calls == [50, 50]
+
+def test_async_calls_from_several_event_loops(redis_client):
+    async def slow_triple(x):
+        await asyncio.sleep(0.5)
+        return x * 3
+
+    # asyncio connections are bound to their loop, so each loop gets its own client
+    clients = {}
+
+    class PerLoopClient:
+        def __getattr__(self, name):
+            return getattr(clients[asyncio.get_running_loop()], name)
+
+    cached_triple = simple_redis_cache_async(PerLoopClient(), ttl=120, raise_redis=True)(slow_triple)
+    results = []
+
+    async def call_with_own_client():
+        loop = asyncio.get_running_loop()
+        clients[loop] = redis.asyncio.Redis(**redis_client.connection_pool.connection_kwargs)
+        try:
+            return await cached_triple(11)
+        finally:
+            await clients.pop(loop).aclose()
+
+    def run_in_own_loop():
+        try:
+            results.append(asyncio.run(call_with_own_client()))
+        except Exception as e:
+            results.append(e)
+
+    # The same call in flight on two loops at once must not share a future across them
+    threads = [threading.Thread(target=run_in_own_loop) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [33, 33]